@@ -6,16 +6,94 @@ import sys
 import threading
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
-from typing import Any
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
 
 from .config import Config
-from .models import GPURequirement, Task, TaskStatus
+from .models import SubmitParams, TaskStatus
 from .scheduler import Scheduler
-from .server import UnixSocketServer
+from .server import FileStream, UnixSocketServer
 
 logger = logging.getLogger(__name__)
 
 
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that batches writes in memory.
+
+    Records are buffered and written when the buffer exceeds `buffer_size`, when
+    `flush_interval` seconds have passed, or immediately for ERROR and above.
+    The file size is tracked in memory, so rollover checks need no syscalls.
+    """
+
+    def __init__(
+        self,
+        filename: Path,
+        maxBytes: int = 0,
+        backupCount: int = 0,
+        flush_interval: float = 5.0,
+        buffer_size: int = 64 * 1024,
+        encoding: str = "utf-8",
+    ) -> None:
+        self._buffer = bytearray()
+        self._timer: Optional[threading.Timer] = None
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        # Records are encoded by hand, so the encoding must be a real codec name
+        # (FileHandler would otherwise store "locale" outside UTF-8 mode)
+        super().__init__(
+            filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding
+        )
+        self._size = self.stream.tell()
+
+    def _open(self) -> BinaryIO:
+        """Open the log file in binary append mode."""
+        return open(self.baseFilename, "ab")
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Buffer a record, rolling over or flushing as needed."""
+        try:
+            data = (self.format(record) + self.terminator).encode(self.encoding)
+            size = self._size
+            if self.maxBytes > 0 and size and size + len(data) >= self.maxBytes:
+                self._write_buffer()
+                self.doRollover()
+                self._size = 0
+
+            self._buffer += data
+            self._size += len(data)
+
+            if len(self._buffer) >= self.buffer_size or record.levelno >= logging.ERROR:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _write_buffer(self) -> None:
+        """Write buffered records to the stream."""
+        if self._buffer and self.stream:
+            self.stream.write(self._buffer)
+            self._buffer.clear()
+
+    def flush(self) -> None:
+        """Write out buffered records and flush the stream."""
+        self.acquire()
+        try:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._write_buffer()
+            if self.stream:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
 def setup_logging(config: Config) -> None:
     """Configure logging."""
     if not config.logs_dir:
@@ -24,7 +102,7 @@ def setup_logging(config: Config) -> None:
     config.logs_dir.mkdir(parents=True, exist_ok=True)
     log_file = config.logs_dir / "gpu-grab.log"
 
-    handler = RotatingFileHandler(
+    handler = BufferedRotatingFileHandler(
         log_file,
         maxBytes=config.log_max_size_mb * 1024 * 1024,
         backupCount=config.log_backup_count,
@@ -36,7 +114,7 @@ def setup_logging(config: Config) -> None:
     )
 
     root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, config.log_level))
+    root_logger.setLevel(config.log_level_int)
     root_logger.addHandler(handler)
 
     # Output to stdout as well (captured by systemd)
@@ -47,48 +125,39 @@ def setup_logging(config: Config) -> None:
     root_logger.addHandler(stdout_handler)
 
 
-def main() -> None:
-    """Main service function."""
-    config = Config.load()
-    setup_logging(config)
-
-    logger.info("GPU Grab Service starting...")
+class RequestHandlers:
+    """Socket request handlers bound to a scheduler."""
 
-    scheduler = Scheduler(config)
+    def __init__(self, scheduler: Scheduler) -> None:
+        self.scheduler = scheduler
 
-    # Request handlers
-    def handle_submit(**params: Any) -> dict[str, Any]:
-        req = GPURequirement(
-            gpu_ids=params.get("gpu_ids"),
-            min_free_memory_gb=params.get("min_free_memory_gb", 0),
-            max_util_percent=params.get("max_util_percent", 100),
-            gpu_count=params.get("gpu_count", 1),
-        )
-        task = Task(
-            name=params.get("name", ""),
-            command=params["command"],
-            working_dir=params.get("working_dir", ""),
-            env=params.get("env", {}),
-            requirements=req,
-            priority=params.get("priority", 0),
+    def submit(self, **params: Any) -> dict[str, Any]:
+        """Submit a new task."""
+        task_id = self.scheduler.queue_manager.add_task_from_params(
+            SubmitParams(**params)
         )
-        task_id = scheduler.queue_manager.add_task(task)
+        self.scheduler.wake()
         return {"task_id": task_id}
 
-    def handle_status() -> dict[str, Any]:
-        return scheduler.get_status()
-
-    def handle_list(status_filter: str = "all") -> dict[str, Any]:
-        tasks = scheduler.queue_manager.get_all_tasks()
-        if status_filter != "all":
-            tasks = [t for t in tasks if t.status.value == status_filter]
-        return {
-            "tasks": [t.to_dict() for t in tasks]
-        }
-
-    def handle_cancel(task_id: str) -> dict[str, Any]:
+    def status(self) -> dict[str, Any]:
+        """Get system status."""
+        return self.scheduler.get_status()
+
+    def list_tasks(self, status_filter: str = "all") -> dict[str, Any]:
+        """List tasks, optionally filtered by status."""
+        queue_manager = self.scheduler.queue_manager
+        if status_filter == "all":
+            tasks = queue_manager.get_all_tasks()
+        else:
+            tasks = queue_manager.get_tasks_by_status(TaskStatus(status_filter))
+        # Task objects are serialized by the server's encoder
+        return {"tasks": tasks}
+
+    def cancel(self, task_id: str) -> dict[str, Any]:
+        """Cancel a pending or running task."""
+        scheduler = self.scheduler
         task = scheduler.queue_manager.get_task(task_id)
-        if task and task.status == TaskStatus.RUNNING:
+        if task and task.status is TaskStatus.RUNNING:
             scheduler.task_runner.kill_task(task)
             task.status = TaskStatus.CANCELLED
             task.finished_at = datetime.now()
@@ -99,35 +168,58 @@ def main() -> None:
             return {"cancelled": success}
         return {"cancelled": False, "error": "Task not found"}
 
-    def handle_logs(
-        task_id: str, tail: int = 100, follow: bool = False
-    ) -> dict[str, Any]:
-        task = scheduler.queue_manager.get_task(task_id)
+    def logs(
+        self, task_id: str, tail: int = 100, follow: bool = False
+    ) -> dict[str, Any] | FileStream:
+        """Get task log content, streamed straight from the log file if present."""
+        task = self.scheduler.queue_manager.get_task(task_id)
         if not task:
             return {"logs": "Task not found"}
 
-        logs = scheduler.task_runner.get_log_content(task, tail, follow)
+        log_range = self.scheduler.task_runner.get_log_range(task, tail)
+        if log_range is not None:
+            return FileStream(*log_range)
+
+        logs = self.scheduler.task_runner.get_log_content(task, tail, follow)
         return {"logs": logs}
 
+
+def main() -> None:
+    """Main service function."""
+    config = Config.load()
+    setup_logging(config)
+
+    logger.info("GPU Grab Service starting...")
+
+    scheduler = Scheduler(config)
+
+    h = RequestHandlers(scheduler)
     handlers = {
-        "submit": handle_submit,
-        "status": handle_status,
-        "list": handle_list,
-        "cancel": handle_cancel,
-        "logs": handle_logs,
+        "submit": h.submit,
+        "status": h.status,
+        "list": h.list_tasks,
+        "cancel": h.cancel,
+        "logs": h.logs,
     }
 
     server = UnixSocketServer(config.socket_path, handlers)
 
-    # Signal handling
+    # Signal handling: only flag the shutdown here, the main thread tears down
+    received_signals: list[int] = []
+
     def signal_handler(signum: int, frame: Any) -> None:
-        logger.info(f"Received signal {signum}, shutting down...")
-        server.stop()
+        received_signals.append(signum)
         scheduler.stop()
 
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
 
+    # Wake the scheduler as soon as a task exits. Signals may land on any
+    # thread, so the C-level handler writes to the scheduler's wakeup fd;
+    # the Python handler only has to exist for that write to happen.
+    signal.set_wakeup_fd(scheduler.wakeup_fd)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
     # Start server in thread
     server_thread = threading.Thread(target=server.start)
     server_thread.daemon = True
@@ -139,7 +231,10 @@ def main() -> None:
     except KeyboardInterrupt:
         pass
     finally:
+        if received_signals:
+            logger.info(f"Received signal {received_signals[0]}, shut down")
         server.stop()
+        scheduler.queue_manager.close()
         logger.info("GPU Grab Service stopped")
 
 
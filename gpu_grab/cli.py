@@ -4,34 +4,74 @@ import argparse
 import json
 import os
 import socket
+import struct
 import sys
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, BinaryIO, Optional
 
 # Default socket location
 DEFAULT_SOCKET_PATH = Path.home() / ".gpu-grab" / "gpu-grab.sock"
 
+# Requests and responses are framed as a 4-byte big-endian length followed by
+# the JSON payload
+HEADER = struct.Struct(">I")
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytearray:
+    """Receive exactly n bytes from the socket."""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    received = 0
+    while received < n:
+        count = sock.recv_into(view[received:], n - received)
+        if count == 0:
+            raise ConnectionError("Connection closed by server")
+        received += count
+    return buf
+
+
+def _copy_exact(sock: socket.socket, n: int, out: BinaryIO) -> None:
+    """Copy exactly n bytes from the socket to out."""
+    buf = bytearray(min(n, 64 * 1024))
+    view = memoryview(buf)
+    while n > 0:
+        count = sock.recv_into(view, min(n, len(buf)))
+        if count == 0:
+            raise ConnectionError("Connection closed by server")
+        out.write(view[:count])
+        n -= count
+
 
 def send_request(
-    socket_path: Path, action: str, params: Optional[dict[str, Any]] = None
+    socket_path: Path,
+    action: str,
+    params: Optional[dict[str, Any]] = None,
+    out: Optional[BinaryIO] = None,
 ) -> dict[str, Any]:
-    """Send request to the server."""
+    """
+    Send request to the server.
+
+    If the server answers with a raw stream, its bytes are copied to `out`
+    (or collected into data["content"] when `out` is None).
+    """
     sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     try:
         sock.connect(str(socket_path))
         request = {"action": action, "params": params or {}}
-        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
-
-        data = b""
-        while True:
-            chunk = sock.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-            if b"\n" in data:
-                break
-
-        return json.loads(data.decode("utf-8"))
+        payload = json.dumps(request).encode("utf-8")
+        sock.sendall(HEADER.pack(len(payload)) + payload)
+
+        (length,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+        response = json.loads(_recv_exact(sock, length))
+
+        data = response.get("data")
+        if response.get("success") and isinstance(data, dict) and data.get("stream"):
+            if out is not None:
+                _copy_exact(sock, data["size"], out)
+                out.flush()
+            else:
+                data["content"] = bytes(_recv_exact(sock, data["size"]))
+        return response
     except FileNotFoundError:
         return {
             "success": False,
@@ -59,7 +99,7 @@ def cmd_submit(args: argparse.Namespace) -> None:
         "max_util_percent": 100 - args.util_margin,
         "gpu_count": args.gpu_count,
         "priority": args.priority,
-        "env": dict(item.split("=", 1) for item in args.env) if args.env else {},
+        "env": dict(map(lambda item: item.split("=", 1), args.env)) if args.env else {},
     }
 
     result = send_request(DEFAULT_SOCKET_PATH, "submit", params)
@@ -149,9 +189,12 @@ def cmd_logs(args: argparse.Namespace) -> None:
         DEFAULT_SOCKET_PATH,
         "logs",
         {"task_id": args.task_id, "tail": args.tail, "follow": args.follow},
+        out=sys.stdout.buffer,
     )
     if result.get("success"):
-        print(result["data"]["logs"], end="")
+        # Streamed logs have already been written to stdout
+        if not result["data"].get("stream"):
+            print(result["data"]["logs"], end="")
     else:
         print(f"Error: {result.get('error')}", file=sys.stderr)
         sys.exit(1)
@@ -1,13 +1,13 @@
 """Configuration management for GPU Grab."""
 
+import logging
+import os
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
-import yaml
 
-
-@dataclass
+@dataclass(slots=True)
 class Config:
     """System configuration."""
 
@@ -21,10 +21,14 @@ class Config:
     check_interval: float = 10.0  # GPU check interval (seconds)
     max_concurrent_tasks: int = 4  # Max concurrent tasks
 
+    # Persistence configuration
+    durable_writes: bool = False  # fsync the task queue on every commit
+
     # Logging configuration
     log_level: str = "INFO"
     log_max_size_mb: int = 10
     log_backup_count: int = 5
+    log_level_int: int = field(init=False, default=logging.INFO)  # Resolved log_level
 
     # Default task configuration
     default_gpu_count: int = 1
@@ -39,9 +43,16 @@ class Config:
         if self.socket_path is None:
             self.socket_path = self.base_dir / "gpu-grab.sock"
 
+        level = logging.getLevelName(self.log_level.upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Invalid log level: {self.log_level}")
+        self.log_level_int = level
+
     @classmethod
     def load(cls, config_file: Optional[Path] = None) -> "Config":
         """Load configuration from file."""
+        import yaml
+
         config = cls()
 
         if config_file is None:
@@ -63,6 +74,8 @@ class Config:
 
     def save(self, config_file: Optional[Path] = None) -> None:
         """Save configuration to file."""
+        import yaml
+
         if config_file is None:
             config_file = self.base_dir / "config.yaml"
 
@@ -71,6 +84,7 @@ class Config:
         data = {
             "check_interval": self.check_interval,
             "max_concurrent_tasks": self.max_concurrent_tasks,
+            "durable_writes": self.durable_writes,
             "log_level": self.log_level,
             "log_max_size_mb": self.log_max_size_mb,
             "log_backup_count": self.log_backup_count,
@@ -79,5 +93,8 @@ class Config:
             "default_max_util_percent": self.default_max_util_percent,
         }
 
-        with open(config_file, "w") as f:
+        # Write beside the target and rename, so readers never see a partial file
+        tmp_file = config_file.with_name(config_file.name + ".tmp")
+        with open(tmp_file, "w") as f:
             yaml.dump(data, f, default_flow_style=False)
+        os.replace(tmp_file, config_file)
@@ -1,7 +1,9 @@
 """GPU monitoring module using pynvml."""
 
 import logging
-from typing import Optional
+import threading
+import time
+from typing import Any, Optional
 
 from pynvml import (
     NVMLError,
@@ -20,21 +22,40 @@ from .models import GPURequirement, GPUStatus
 
 logger = logging.getLogger(__name__)
 
+# How long a full GPU sweep is reused by concurrent callers (seconds)
+SNAPSHOT_TTL = 0.5
+
 
 class GPUMonitor:
     """GPU status monitor using NVML."""
 
     def __init__(self) -> None:
         self._initialized = False
+        # Device handles and names are fixed for the lifetime of the NVML session
+        self._handles: dict[int, Any] = {}
+        self._names: dict[int, str] = {}
+        # Short-lived snapshot shared by the scheduler and status requests
+        self._snapshot: Optional[list[GPUStatus]] = None
+        self._snapshot_ts: float = 0.0
+        self._snapshot_lock = threading.Lock()
 
     def initialize(self) -> None:
-        """Initialize NVML."""
+        """Initialize NVML and cache device handles."""
         if not self._initialized:
             try:
                 nvmlInit()
+                for i in range(nvmlDeviceGetCount()):
+                    handle = nvmlDeviceGetHandleByIndex(i)
+                    name = nvmlDeviceGetName(handle)
+                    if isinstance(name, bytes):
+                        name = name.decode("utf-8")
+                    self._handles[i] = handle
+                    self._names[i] = name
                 self._initialized = True
                 logger.info("NVML initialized successfully")
             except NVMLError as e:
+                self._handles.clear()
+                self._names.clear()
                 logger.error(f"Failed to initialize NVML: {e}")
                 raise
 
@@ -44,29 +65,31 @@ class GPUMonitor:
             try:
                 nvmlShutdown()
                 self._initialized = False
+                self._handles.clear()
+                self._names.clear()
+                self._snapshot = None
                 logger.info("NVML shutdown")
             except NVMLError as e:
                 logger.warning(f"Error shutting down NVML: {e}")
 
     def get_gpu_count(self) -> int:
         """Get the number of GPUs."""
-        self.initialize()
         try:
-            return nvmlDeviceGetCount()
+            self.initialize()
         except NVMLError as e:
             logger.error(f"Failed to get GPU count: {e}")
             return 0
+        return len(self._handles)
 
     def get_gpu_status(self, index: int) -> GPUStatus:
         """Get status of a single GPU."""
         self.initialize()
         try:
-            handle = nvmlDeviceGetHandleByIndex(index)
-
-            name = nvmlDeviceGetName(handle)
-            if isinstance(name, bytes):
-                name = name.decode("utf-8")
+            handle = self._handles[index]
+            name = self._names[index]
 
+            # nvmlDeviceGetFieldValues cannot batch these: NVML exposes no field
+            # IDs for framebuffer usage, GPU utilization or core temperature
             memory = nvmlDeviceGetMemoryInfo(handle)
             util = nvmlDeviceGetUtilizationRates(handle)
             temp = nvmlDeviceGetTemperature(handle, NVML_TEMPERATURE_GPU)
@@ -85,9 +108,24 @@ class GPUMonitor:
             raise
 
     def get_all_gpu_status(self) -> list[GPUStatus]:
-        """Get status of all GPUs."""
-        count = self.get_gpu_count()
-        return [self.get_gpu_status(i) for i in range(count)]
+        """Get status of all GPUs, reusing a sweep younger than SNAPSHOT_TTL."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._snapshot_ts < SNAPSHOT_TTL:
+            return list(snapshot)
+
+        with self._snapshot_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if (
+                self._snapshot is not None
+                and time.monotonic() - self._snapshot_ts < SNAPSHOT_TTL
+            ):
+                return list(self._snapshot)
+
+            self.initialize()
+            snapshot = [self.get_gpu_status(i) for i in self._handles]
+            self._snapshot = snapshot
+            self._snapshot_ts = time.monotonic()
+            return list(snapshot)
 
     def check_requirements(
         self, requirements: GPURequirement, excluded_gpus: Optional[set[int]] = None
@@ -108,16 +146,21 @@ class GPUMonitor:
         except NVMLError:
             return None
 
+        gpu_id_set = set(requirements.gpu_ids) if requirements.gpu_ids else None
         candidates: list[int] = []
 
         for gpu in all_gpus:
+            # Stop as soon as enough GPUs have been found
+            if len(candidates) >= requirements.gpu_count:
+                break
+
             # Skip GPUs already assigned to running tasks
             if gpu.index in excluded_gpus:
                 logger.debug(f"GPU {gpu.index}: excluded (assigned to another task)")
                 continue
 
             # If specific GPU IDs are requested, only consider those
-            if requirements.gpu_ids and gpu.index not in requirements.gpu_ids:
+            if gpu_id_set is not None and gpu.index not in gpu_id_set:
                 continue
 
             # Check memory requirement
@@ -1,10 +1,20 @@
 """Data models for GPU Grab."""
 
+import os
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Any, Optional
-import uuid
+
+
+def new_task_id() -> str:
+    """Generate a random 8-hex-character task ID."""
+    return os.urandom(4).hex()
+
+
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO-format timestamp, passing through empty values as None."""
+    return datetime.fromisoformat(value) if value else None
 
 
 class TaskStatus(Enum):
@@ -17,7 +27,7 @@ class TaskStatus(Enum):
     CANCELLED = "cancelled"  # Cancelled by user
 
 
-@dataclass
+@dataclass(slots=True)
 class GPURequirement:
     """GPU resource requirements."""
 
@@ -46,11 +56,26 @@ class GPURequirement:
         )
 
 
-@dataclass
+@dataclass(slots=True)
+class SubmitParams:
+    """Parameters of a submit request."""
+
+    command: str
+    name: str = ""
+    working_dir: str = ""
+    gpu_ids: Optional[list[int]] = None
+    min_free_memory_gb: float = 0.0
+    max_util_percent: float = 100.0
+    gpu_count: int = 1
+    priority: int = 0
+    env: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
 class Task:
     """Training task."""
 
-    id: str = field(default_factory=lambda: str(uuid.uuid4())[:8])
+    id: str = field(default_factory=new_task_id)
     name: str = ""
     command: str = ""
     working_dir: str = ""
@@ -94,33 +119,28 @@ class Task:
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "Task":
         """Create from dictionary."""
+        g = data.get
         return cls(
             id=data["id"],
-            name=data.get("name", ""),
-            command=data.get("command", ""),
-            working_dir=data.get("working_dir", ""),
-            env=data.get("env", {}),
-            requirements=GPURequirement.from_dict(data.get("requirements", {})),
-            status=TaskStatus(data.get("status", "pending")),
-            priority=data.get("priority", 0),
-            created_at=datetime.fromisoformat(data["created_at"])
-            if data.get("created_at")
-            else datetime.now(),
-            started_at=datetime.fromisoformat(data["started_at"])
-            if data.get("started_at")
-            else None,
-            finished_at=datetime.fromisoformat(data["finished_at"])
-            if data.get("finished_at")
-            else None,
-            assigned_gpus=data.get("assigned_gpus", []),
-            pid=data.get("pid"),
-            exit_code=data.get("exit_code"),
-            error_message=data.get("error_message", ""),
-            log_file=data.get("log_file", ""),
+            name=g("name", ""),
+            command=g("command", ""),
+            working_dir=g("working_dir", ""),
+            env=g("env", {}),
+            requirements=GPURequirement.from_dict(g("requirements", {})),
+            status=TaskStatus(g("status", "pending")),
+            priority=g("priority", 0),
+            created_at=_parse_dt(g("created_at")) or datetime.now(),
+            started_at=_parse_dt(g("started_at")),
+            finished_at=_parse_dt(g("finished_at")),
+            assigned_gpus=g("assigned_gpus", []),
+            pid=g("pid"),
+            exit_code=g("exit_code"),
+            error_message=g("error_message", ""),
+            log_file=g("log_file", ""),
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class GPUStatus:
     """GPU status information."""
 
@@ -132,15 +152,15 @@ class GPUStatus:
     utilization_percent: int
     temperature: int = 0
 
-    @property
-    def free_memory_gb(self) -> float:
-        """Get free memory in GB."""
-        return self.free_memory_mb / 1024.0
+    # Derived values, computed once since a status snapshot never changes
+    free_memory_gb: float = field(init=False, default=0.0)  # Free memory in GB
+    is_idle: bool = field(init=False, default=False)  # Utilization < 5%
+    _free_memory_gb_rounded: float = field(init=False, default=0.0, repr=False)
 
-    @property
-    def is_idle(self) -> bool:
-        """Check if GPU is idle (utilization < 5%)."""
-        return self.utilization_percent < 5
+    def __post_init__(self) -> None:
+        self.free_memory_gb = self.free_memory_mb / 1024.0
+        self.is_idle = self.utilization_percent < 5
+        self._free_memory_gb_rounded = round(self.free_memory_gb, 2)
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary."""
@@ -150,7 +170,7 @@ class GPUStatus:
             "total_memory_mb": self.total_memory_mb,
             "used_memory_mb": self.used_memory_mb,
             "free_memory_mb": self.free_memory_mb,
-            "free_memory_gb": round(self.free_memory_gb, 2),
+            "free_memory_gb": self._free_memory_gb_rounded,
             "utilization_percent": self.utilization_percent,
             "temperature": self.temperature,
             "is_idle": self.is_idle,
@@ -1,155 +1,503 @@
-"""Task queue management with JSON persistence."""
+"""Task queue management with SQLite persistence."""
 
-import fcntl
 import json
 import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Optional
 
-from .models import Task, TaskStatus
+from .models import GPURequirement, SubmitParams, Task, TaskStatus, new_task_id
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+if orjson is not None:
+
+    def _dumps(obj: Any) -> str:
+        """Encode obj as JSON text."""
+        return orjson.dumps(obj).decode("utf-8")
+
+    _loads = orjson.loads
+
+else:
+    _dumps = json.dumps
+    _loads = json.loads
+
+# Column order of the tasks table (matches Task field order); env, requirements
+# and assigned_gpus are stored as JSON text
+COLUMNS = (
+    "id",
+    "name",
+    "command",
+    "working_dir",
+    "env",
+    "requirements",
+    "status",
+    "priority",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "assigned_gpus",
+    "pid",
+    "exit_code",
+    "error_message",
+    "log_file",
+)
+
+# Seconds between WAL checkpoints requested by flush(); with synchronous=NORMAL
+# checkpoints are the only fsyncs the queue issues
+FLUSH_INTERVAL = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    command TEXT NOT NULL DEFAULT '',
+    working_dir TEXT NOT NULL DEFAULT '',
+    env TEXT NOT NULL DEFAULT '{}',
+    requirements TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    assigned_gpus TEXT NOT NULL DEFAULT '[]',
+    pid INTEGER,
+    exit_code INTEGER,
+    error_message TEXT NOT NULL DEFAULT '',
+    log_file TEXT NOT NULL DEFAULT ''
+);
+-- Reads are served from the in-memory cache, so secondary indexes would only
+-- add work to every write; drop the ones earlier versions created
+DROP INDEX IF EXISTS idx_tasks_status;
+DROP INDEX IF EXISTS idx_tasks_finished_at;
+"""
+
+_SELECT = f"SELECT {', '.join(COLUMNS)} FROM tasks"
+_INSERT = (
+    f"INSERT INTO tasks ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+_INSERT_OR_IGNORE = _INSERT.replace("INSERT", "INSERT OR IGNORE", 1)
+_UPDATE = (
+    f"UPDATE tasks SET {', '.join(f'{c} = ?' for c in COLUMNS[1:])} WHERE id = ?"
+)
+
+
+# Status values as stored in the database
+_STATUS_BY_VALUE = {s.value: s for s in TaskStatus}
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    """Format an optional timestamp for storage."""
+    return value.isoformat() if value else None
+
+
+def _task_to_row(task: Task) -> tuple[Any, ...]:
+    """Convert a task to a row tuple in COLUMNS order."""
+    return (
+        task.id,
+        task.name,
+        task.command,
+        task.working_dir,
+        _dumps(task.env),
+        _dumps(task.requirements.to_dict()),
+        task.status.value,
+        task.priority,
+        _iso(task.created_at),
+        _iso(task.started_at),
+        _iso(task.finished_at),
+        _dumps(task.assigned_gpus),
+        task.pid,
+        task.exit_code,
+        task.error_message,
+        task.log_file,
+    )
+
+
+def _row_to_task(row: tuple[Any, ...]) -> Task:
+    """Convert a row tuple in COLUMNS order to a task."""
+    (
+        task_id,
+        name,
+        command,
+        working_dir,
+        env,
+        requirements,
+        status,
+        priority,
+        created_at,
+        started_at,
+        finished_at,
+        assigned_gpus,
+        pid,
+        exit_code,
+        error_message,
+        log_file,
+    ) = row
+    return Task(
+        id=task_id,
+        name=name,
+        command=command,
+        working_dir=working_dir,
+        env=_loads(env),
+        requirements=GPURequirement.from_dict(_loads(requirements)),
+        status=_STATUS_BY_VALUE[status],
+        priority=priority,
+        created_at=datetime.fromisoformat(created_at),
+        started_at=datetime.fromisoformat(started_at) if started_at else None,
+        finished_at=datetime.fromisoformat(finished_at) if finished_at else None,
+        assigned_gpus=_loads(assigned_gpus),
+        pid=pid,
+        exit_code=exit_code,
+        error_message=error_message,
+        log_file=log_file,
+    )
+
 
 class QueueManager:
-    """Task queue manager with file-based persistence."""
+    """Task queue manager with an in-memory cache over SQLite (WAL mode)."""
 
-    def __init__(self, data_dir: Path) -> None:
+    def __init__(self, data_dir: Path, durable_writes: bool = False) -> None:
         self.data_dir = data_dir
-        self.tasks_file = data_dir / "tasks.json"
+        self.db_file = data_dir / "tasks.db"
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self._ensure_file()
 
-    def _ensure_file(self) -> None:
-        """Ensure the tasks file exists."""
-        if not self.tasks_file.exists():
-            self._save_tasks([])
+        # Shared by the scheduler and server threads. _lock guards the cache and
+        # is never held across SQLite I/O; _db_lock guards the connection (and
+        # _unsaved/_dirty). When both are needed, _db_lock is taken first.
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # Per-thread IDs of tasks updated inside batch(), written when it exits
+        self._local = threading.local()
+        # Updates whose write failed; retried with the next batch or close()
+        self._unsaved: dict[str, None] = {}
+        # Set by every mutation, cleared when flush() checkpoints the WAL
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(
+            self.db_file, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL may lose the last commits on power loss (never on a crash);
+        # FULL syncs the WAL on every commit
+        synchronous = "FULL" if durable_writes else "NORMAL"
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        # Truncate the WAL back to 4 MiB after each automatic checkpoint
+        self._conn.execute("PRAGMA journal_size_limit=4194304")
+        self._conn.executescript(SCHEMA)
+        self._migrate_json(data_dir / "tasks.json")
+
+        # Authoritative in-memory copy; the database is only read at startup
+        rows = self._conn.execute(f"{_SELECT} ORDER BY rowid").fetchall()
+        self._cache: dict[str, Task] = {}
+        # Tasks grouped by the status they were last stored with
+        self._by_status: dict[TaskStatus, dict[str, Task]] = {s: {} for s in TaskStatus}
+        self._status_of: dict[str, TaskStatus] = {}
+        # Per-status counts, rebuilt lazily after the index changes
+        self._stats: Optional[dict[str, int]] = None
+        for row in rows:
+            task = _row_to_task(row)
+            self._cache[task.id] = task
+            self._index(task)
+
+    def _migrate_json(self, tasks_file: Path) -> None:
+        """Import tasks from the legacy tasks.json file, if present."""
+        if not tasks_file.exists():
+            return
 
-    def _load_tasks(self) -> list[Task]:
-        """Load tasks from file."""
         try:
-            with open(self.tasks_file, "r") as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-                try:
-                    data = json.load(f)
-                    return [Task.from_dict(t) for t in data]
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            logger.warning(f"Error loading tasks: {e}, returning empty list")
-            return []
-
-    def _save_tasks(self, tasks: list[Task]) -> None:
-        """Save tasks to file."""
-        with open(self.tasks_file, "w") as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            with open(tasks_file, "rb") as f:
+                records = _loads(f.read())
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Could not migrate {tasks_file}: {e}")
+            return
+
+        rows = [_task_to_row(Task.from_dict(r)) for r in records]
+        with self._db_lock:
+            self._conn.execute("BEGIN")
             try:
-                data = [t.to_dict() for t in tasks]
-                json.dump(data, f, indent=2, default=str)
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                self._conn.executemany(_INSERT_OR_IGNORE, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        tasks_file.rename(tasks_file.with_name(tasks_file.name + ".migrated"))
+        logger.info(f"Migrated {len(rows)} tasks from {tasks_file}")
+
+    def _index(self, task: Task) -> None:
+        """Record a task under its current status, moving it if it changed."""
+        old = self._status_of.get(task.id)
+        if old is not task.status:
+            self._stats = None
+            if old is not None:
+                del self._by_status[old][task.id]
+        self._by_status[task.status][task.id] = task
+        self._status_of[task.id] = task.status
+
+    def _unindex(self, task_id: str) -> None:
+        """Drop a task from the status index."""
+        status = self._status_of.pop(task_id, None)
+        if status is not None:
+            del self._by_status[status][task_id]
+            self._stats = None
+
+    def _execute(self, sql: str, params: tuple[Any, ...] = ()) -> int:
+        """Run a mutating statement and return the number of affected rows.
+
+        Callers hold _db_lock.
+        """
+        self._dirty = True
+        return self._conn.execute(sql, params).rowcount
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Collect this thread's update_task writes and commit them together on exit.
+
+        The cache is updated immediately; only the database write is deferred,
+        and it is made from the tasks' state at exit. Other threads and other
+        mutations keep writing (and committing) straight away. Nested batches
+        join the outermost one. Updates made before an error are still written.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
+
+        pending: dict[str, None] = {}
+        self._local.pending = pending
+        try:
+            yield
+        finally:
+            self._local.pending = None
+            self._write_updates(pending)
+
+    def _write_updates(self, task_ids: dict[str, None]) -> None:
+        """Write the cached state of the given tasks in one transaction."""
+        with self._db_lock:
+            task_ids = {**self._unsaved, **task_ids}
+            with self._lock:
+                tasks = [self._cache.get(task_id) for task_id in task_ids]
+            rows = []
+            for task in tasks:
+                if task is not None:
+                    row = _task_to_row(task)
+                    rows.append(row[1:] + row[:1])
+            if not rows:
+                self._unsaved = {}
+                return
+
+            self._dirty = True
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(_UPDATE, rows)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                self._unsaved = task_ids
+                logger.error(f"Failed to write {len(rows)} task updates: {e}")
+                return
+            self._unsaved = {}
+
+    def flush(self, max_age: float = 0.0) -> bool:
+        """
+        Checkpoint the WAL into the database if it changed since the last flush.
+
+        Skipped when the last flush is younger than `max_age` seconds.
+        Returns True if a checkpoint ran.
+        """
+        with self._db_lock:
+            if not self._dirty:
+                return False
+            if time.monotonic() - self._last_flush < max_age:
+                return False
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            except sqlite3.Error as e:
+                logger.warning(f"WAL checkpoint failed: {e}")
+                return False
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        return True
+
+    def close(self) -> None:
+        """Fold the WAL back into the database and close the connection."""
+        self._write_updates({})
+        with self._db_lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                logger.warning(f"WAL checkpoint failed: {e}")
+            self._conn.close()
 
     def add_task(self, task: Task) -> str:
         """Add a task to the queue."""
-        tasks = self._load_tasks()
-        tasks.append(task)
-        self._save_tasks(tasks)
+        with self._db_lock:
+            self._execute(_INSERT, _task_to_row(task))
+            with self._lock:
+                self._cache[task.id] = task
+                self._index(task)
         logger.info(f"Added task {task.id}: {task.name}")
         return task.id
 
+    def add_task_from_params(self, params: SubmitParams) -> str:
+        """Add a pending task built from submit parameters."""
+        task = Task(
+            id=new_task_id(),
+            name=params.name,
+            command=params.command,
+            working_dir=params.working_dir,
+            env=params.env,
+            requirements=GPURequirement(
+                gpu_ids=params.gpu_ids,
+                min_free_memory_gb=params.min_free_memory_gb,
+                max_util_percent=params.max_util_percent,
+                gpu_count=params.gpu_count,
+            ),
+            priority=params.priority,
+        )
+        return self.add_task(task)
+
     def get_task(self, task_id: str) -> Optional[Task]:
         """Get a single task by ID."""
-        tasks = self._load_tasks()
-        for task in tasks:
-            if task.id == task_id:
-                return task
-        return None
+        with self._lock:
+            return self._cache.get(task_id)
 
     def update_task(self, task: Task) -> None:
-        """Update a task."""
-        tasks = self._load_tasks()
-        for i, t in enumerate(tasks):
-            if t.id == task.id:
-                tasks[i] = task
-                break
-        self._save_tasks(tasks)
+        """Update a task; unknown task IDs are ignored."""
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            with self._lock:
+                if task.id not in self._cache:
+                    return
+                self._cache[task.id] = task
+                self._index(task)
+                pending[task.id] = None
+            logger.debug(f"Updated task {task.id}")
+            return
+
+        with self._db_lock:
+            with self._lock:
+                if task.id not in self._cache:
+                    return
+            try:
+                row = _task_to_row(task)
+                self._execute(_UPDATE, row[1:] + row[:1])
+            except sqlite3.Error as e:
+                # Callers change tasks in place, so the cache cannot be rolled
+                # back; keep the row for the next write instead
+                self._unsaved[task.id] = None
+                logger.error(f"Failed to write task {task.id}, will retry: {e}")
+                raise
+            finally:
+                with self._lock:
+                    self._cache[task.id] = task
+                    self._index(task)
         logger.debug(f"Updated task {task.id}")
 
     def remove_task(self, task_id: str) -> bool:
         """Remove a task from the queue."""
-        tasks = self._load_tasks()
-        original_len = len(tasks)
-        tasks = [t for t in tasks if t.id != task_id]
-        if len(tasks) < original_len:
-            self._save_tasks(tasks)
-            logger.info(f"Removed task {task_id}")
-            return True
-        return False
+        with self._db_lock:
+            with self._lock:
+                if task_id not in self._cache:
+                    return False
+            self._execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            with self._lock:
+                del self._cache[task_id]
+                self._unindex(task_id)
+        logger.info(f"Removed task {task_id}")
+        return True
 
     def get_all_tasks(self) -> list[Task]:
         """Get all tasks."""
-        return self._load_tasks()
+        with self._lock:
+            return list(self._cache.values())
 
     def get_pending_tasks(self) -> list[Task]:
         """Get pending tasks sorted by priority."""
-        tasks = self._load_tasks()
-        pending = [t for t in tasks if t.status == TaskStatus.PENDING]
+        pending = self.get_tasks_by_status(TaskStatus.PENDING)
         return sorted(pending, key=lambda x: (-x.priority, x.created_at))
 
     def get_running_tasks(self) -> list[Task]:
         """Get running tasks."""
-        tasks = self._load_tasks()
-        return [t for t in tasks if t.status == TaskStatus.RUNNING]
+        return self.get_tasks_by_status(TaskStatus.RUNNING)
 
     def get_tasks_by_status(self, status: TaskStatus) -> list[Task]:
         """Get tasks by status."""
-        tasks = self._load_tasks()
-        return [t for t in tasks if t.status == status]
+        with self._lock:
+            return list(self._by_status[status].values())
 
     def cancel_task(self, task_id: str) -> bool:
         """Cancel a pending task."""
-        task = self.get_task(task_id)
-        if task and task.status == TaskStatus.PENDING:
-            from datetime import datetime
-
-            task.status = TaskStatus.CANCELLED
-            task.finished_at = datetime.now()
-            self.update_task(task)
-            logger.info(f"Cancelled task {task_id}")
-            return True
-        return False
+        with self._db_lock:
+            with self._lock:
+                task = self._cache.get(task_id)
+                if task is None or task.status is not TaskStatus.PENDING:
+                    return False
+            finished_at = datetime.now()
+            self._execute(
+                "UPDATE tasks SET status = ?, finished_at = ? WHERE id = ?",
+                (TaskStatus.CANCELLED.value, finished_at.isoformat(), task_id),
+            )
+            with self._lock:
+                if task.status is not TaskStatus.PENDING:
+                    # A batched update started it while the row was written;
+                    # the cache wins and the row is rewritten with it
+                    self._unsaved[task_id] = None
+                    return False
+                task.status = TaskStatus.CANCELLED
+                task.finished_at = finished_at
+                self._index(task)
+        logger.info(f"Cancelled task {task_id}")
+        return True
 
     def get_statistics(self) -> dict[str, Any]:
         """Get queue statistics."""
-        tasks = self._load_tasks()
-        return {
-            "total": len(tasks),
-            "pending": len([t for t in tasks if t.status == TaskStatus.PENDING]),
-            "running": len([t for t in tasks if t.status == TaskStatus.RUNNING]),
-            "completed": len([t for t in tasks if t.status == TaskStatus.COMPLETED]),
-            "failed": len([t for t in tasks if t.status == TaskStatus.FAILED]),
-            "cancelled": len([t for t in tasks if t.status == TaskStatus.CANCELLED]),
-        }
+        with self._lock:
+            if self._stats is None:
+                stats = {"total": len(self._cache)}
+                for status, tasks in self._by_status.items():
+                    stats[status.value] = len(tasks)
+                self._stats = stats
+            # Callers get their own copy; the cached dict is never handed out
+            return dict(self._stats)
 
     def cleanup_old_tasks(self, max_age_days: int = 7) -> int:
         """Remove completed/failed/cancelled tasks older than max_age_days."""
-        from datetime import datetime, timedelta
-
-        tasks = self._load_tasks()
         cutoff = datetime.now() - timedelta(days=max_age_days)
         terminal_states = {TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED}
 
-        original_len = len(tasks)
-        tasks = [
-            t
-            for t in tasks
-            if t.status not in terminal_states
-            or (t.finished_at and t.finished_at > cutoff)
-        ]
-        removed = original_len - len(tasks)
+        with self._db_lock:
+            with self._lock:
+                expired = [
+                    t.id
+                    for status in terminal_states
+                    for t in self._by_status[status].values()
+                    if not (t.finished_at and t.finished_at > cutoff)
+                ]
+            if expired:
+                self._dirty = True
+            self._conn.executemany(
+                "DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in expired]
+            )
+            with self._lock:
+                for task_id in expired:
+                    del self._cache[task_id]
+                    self._unindex(task_id)
+        removed = len(expired)
 
         if removed > 0:
-            self._save_tasks(tasks)
             logger.info(f"Cleaned up {removed} old tasks")
 
         return removed
@@ -1,7 +1,8 @@
 """Main task scheduler."""
 
 import logging
-import threading
+import selectors
+import socket
 import time
 from datetime import datetime
 from typing import Any, Optional
@@ -9,7 +10,7 @@ from typing import Any, Optional
 from .config import Config
 from .gpu_monitor import GPUMonitor
 from .models import TaskStatus
-from .queue_manager import QueueManager
+from .queue_manager import FLUSH_INTERVAL, QueueManager
 from .task_runner import TaskRunner
 
 logger = logging.getLogger(__name__)
@@ -22,17 +23,23 @@ class Scheduler:
         self.config = config
         self.gpu_monitor = GPUMonitor()
         # Ensure directories are correctly set from config
-        self.queue_manager = QueueManager(config.data_dir)
+        self.queue_manager = QueueManager(config.data_dir, config.durable_writes)
         self.task_runner = TaskRunner(config.logs_dir)
 
         self._running = False
-        self._lock = threading.Lock()
+        # Self-pipe the loop sleeps on. Writing to it takes no locks, so it
+        # is safe from signal handlers and can serve as the signal wakeup fd.
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
         self.start_time: Optional[datetime] = None
+        self._start_monotonic: Optional[float] = None
 
     def start(self) -> None:
         """Start the scheduler loop."""
         self._running = True
         self.start_time = datetime.now()
+        self._start_monotonic = time.monotonic()
         self.gpu_monitor.initialize()
 
         logger.info("GPU Grab Scheduler started")
@@ -40,40 +47,82 @@ class Scheduler:
         logger.info(f"Max concurrent tasks: {self.config.max_concurrent_tasks}")
 
         try:
-            while self._running:
-                try:
-                    self._tick()
-                except Exception as e:
-                    logger.exception(f"Error in scheduler tick: {e}")
-                time.sleep(self.config.check_interval)
+            with selectors.DefaultSelector() as selector:
+                selector.register(self._wake_r, selectors.EVENT_READ)
+                while self._running:
+                    try:
+                        self._tick()
+                    except Exception as e:
+                        logger.exception(f"Error in scheduler tick: {e}")
+                    # check_interval is only a safety net; wake() ends the wait
+                    if selector.select(self.config.check_interval):
+                        self._drain_wakeups()
+            logger.info("GPU Grab Scheduler stopping...")
         finally:
             self.task_runner.cleanup()
             self.gpu_monitor.shutdown()
 
     def stop(self) -> None:
-        """Stop the scheduler."""
+        """Stop the scheduler (safe to call from a signal handler)."""
         self._running = False
-        logger.info("GPU Grab Scheduler stopping...")
+        self.wake()
+
+    def wake(self) -> None:
+        """Run the next tick now (safe to call from any thread or signal handler)."""
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            # Buffer full: a wakeup is already pending
+            pass
+
+    @property
+    def wakeup_fd(self) -> int:
+        """File descriptor suitable for signal.set_wakeup_fd()."""
+        return self._wake_w.fileno()
+
+    def _drain_wakeups(self) -> None:
+        """Discard pending wakeup bytes so the next wait blocks again."""
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
 
     def _tick(self) -> None:
         """Single iteration of the scheduling loop."""
-        with self._lock:
+        # One wall-clock read stamps every transition in this tick
+        now = datetime.now()
+        with self.queue_manager.batch():
             # 1. Check running tasks
-            self._check_running_tasks()
+            self._check_running_tasks(now)
 
             # 2. Schedule pending tasks
-            self._schedule_pending_tasks()
+            self._schedule_pending_tasks(now)
 
-    def _check_running_tasks(self) -> None:
+        # 3. Fold the WAL back here, so the fsync rarely lands on a client request
+        self.queue_manager.flush(FLUSH_INTERVAL)
+
+    def _check_running_tasks(self, now: datetime) -> None:
         """Check status of currently running tasks."""
         running_tasks = self.queue_manager.get_running_tasks()
+        finished = self.task_runner.reap_finished()
 
         for task in running_tasks:
-            exit_code = self.task_runner.check_task(task)
+            # A cancel from a request handler may have landed since the
+            # snapshot; its state must not be overwritten with the exit code
+            if task.status is not TaskStatus.RUNNING:
+                continue
+            if task.id in finished:
+                exit_code = finished[task.id]
+            elif task.id in self.task_runner.running_processes:
+                continue
+            else:
+                # Not our child (started before a restart): probe by PID
+                exit_code = self.task_runner.check_task(task)
 
-            if exit_code is not None:
+            if exit_code is not None and task.status is TaskStatus.RUNNING:
                 task.exit_code = exit_code
-                task.finished_at = datetime.now()
+                task.finished_at = now
 
                 if exit_code == 0:
                     task.status = TaskStatus.COMPLETED
@@ -87,11 +136,12 @@ class Scheduler:
 
                 self.queue_manager.update_task(task)
 
-    def _schedule_pending_tasks(self) -> None:
+    def _schedule_pending_tasks(self, now: datetime) -> None:
         """Schedule pending tasks if resources are available."""
         # Check concurrency limit
         running_tasks = self.queue_manager.get_running_tasks()
-        if len(running_tasks) >= self.config.max_concurrent_tasks:
+        running_count = len(running_tasks)
+        if running_count >= self.config.max_concurrent_tasks:
             logger.debug("Max concurrent tasks reached, skipping scheduling")
             return
 
@@ -110,10 +160,7 @@ class Scheduler:
 
         for task in pending_tasks:
             # Check concurrency limit again (in case we started tasks in this loop)
-            if (
-                len(self.queue_manager.get_running_tasks())
-                >= self.config.max_concurrent_tasks
-            ):
+            if running_count >= self.config.max_concurrent_tasks:
                 break
 
             # Check if GPU resources are available, excluding already occupied GPUs
@@ -121,13 +168,18 @@ class Scheduler:
                 task.requirements, excluded_gpus=occupied_gpus
             )
 
+            # Cancelled by a request handler since the snapshot was taken
+            if task.status is not TaskStatus.PENDING:
+                continue
+
             if available_gpus:
                 logger.info(
                     f"Scheduling task {task.id} ('{task.name}') on GPUs {available_gpus}"
                 )
 
-                if self.task_runner.start_task(task, available_gpus):
+                if self.task_runner.start_task(task, available_gpus, now):
                     self.queue_manager.update_task(task)
+                    running_count += 1
                     # Add newly assigned GPUs to occupied set for this tick
                     occupied_gpus.update(available_gpus)
                 else:
@@ -147,8 +199,9 @@ class Scheduler:
             gpu_data = []
 
         uptime = 0.0
-        if self.start_time:
-            uptime = (datetime.now() - self.start_time).total_seconds()
+        if self._start_monotonic is not None:
+            # Monotonic, so NTP steps or clock changes cannot skew it
+            uptime = time.monotonic() - self._start_monotonic
 
         return {
             "running": self._running,
@@ -3,13 +3,81 @@
 import json
 import logging
 import os
+import selectors
 import socket
+import struct
 import threading
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path, PurePath
 from typing import Any, Callable, Optional
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Requests and responses are framed as a 4-byte big-endian length followed by
+# the JSON payload
+HEADER = struct.Struct(">I")
+
+# Upper bound on a request payload; real requests are a few hundred bytes
+MAX_REQUEST_SIZE = 1024 * 1024
+
+# Worker threads serving connections, and how long a client may stall one
+MAX_WORKERS = 8
+CONNECTION_TIMEOUT = 30.0
+
+# struct ucred returned by SO_PEERCRED: pid, uid, gid
+PEERCRED = struct.Struct("3i")
+
+
+@dataclass(slots=True)
+class FileStream:
+    """Handler result asking the server to stream a file region verbatim.
+
+    The client receives a JSON header ``{"stream": true, "size": N}`` followed by
+    exactly N raw bytes sent with sendfile(2).
+    """
+
+    path: str
+    offset: int
+    size: int
+
+
+def _default(obj: Any) -> Any:
+    """Serialize objects the JSON encoder does not handle natively."""
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, PurePath):
+        return str(obj)
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def _dumps(obj: Any) -> bytes:
+        """Encode obj as JSON bytes (dataclasses are serialized natively)."""
+        return orjson.dumps(obj, default=_default)
+
+else:
+
+    def _dumps(obj: Any) -> bytes:
+        """Encode obj as JSON bytes."""
+        return json.dumps(obj, default=_default).encode("utf-8")
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError
+_loads = orjson.loads if orjson is not None else json.loads
+
 
 class UnixSocketServer:
     """Unix socket server for CLI communication."""
@@ -21,6 +89,15 @@ class UnixSocketServer:
         self.handlers = handlers
         self._running = False
         self._socket: Optional[socket.socket] = None
+        self._pool = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="gpu-grab-srv"
+        )
+        # Self-pipe: stop() writes to it to wake the accept loop
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        # Accepted connections not yet closed; stop() shuts them down so the
+        # pool's workers, which the interpreter joins at exit, return at once
+        self._connections: set[socket.socket] = set()
+        self._connections_lock = threading.Lock()
 
     def start(self) -> None:
         """Start the socket server."""
@@ -35,8 +112,8 @@ class UnixSocketServer:
 
         self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self._socket.bind(str(self.socket_path))
-        self._socket.listen(5)
-        self._socket.settimeout(1.0)  # Allow checking _running flag
+        self._socket.listen(socket.SOMAXCONN)
+        self._socket.setblocking(False)
 
         # Set permissions so only user can access
         os.chmod(self.socket_path, 0o600)
@@ -44,28 +121,58 @@ class UnixSocketServer:
         self._running = True
         logger.info(f"Unix socket server listening on {self.socket_path}")
 
+        # Sleep until a client connects or stop() is called
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._socket, selectors.EVENT_READ)
+            selector.register(self._wakeup_r, selectors.EVENT_READ)
+            try:
+                while self._running:
+                    for key, _ in selector.select():
+                        if key.fileobj is self._socket:
+                            self._accept_pending()
+            finally:
+                self._wakeup_r.close()
+
+    def _accept_pending(self) -> None:
+        """Accept every queued connection and hand it to the worker pool."""
         while self._running:
             try:
                 conn, _ = self._socket.accept()
-                thread = threading.Thread(
-                    target=self._handle_connection, args=(conn,)
-                )
-                thread.daemon = True
-                thread.start()
-            except socket.timeout:
-                continue
+            except BlockingIOError:
+                return
             except Exception as e:
                 if self._running:
                     logger.error(f"Socket accept error: {e}")
+                return
+            # Bounded so a stalled client cannot pin a worker forever
+            conn.settimeout(CONNECTION_TIMEOUT)
+            with self._connections_lock:
+                self._connections.add(conn)
+            self._pool.submit(self._handle_connection, conn)
 
     def stop(self) -> None:
         """Stop the socket server."""
         self._running = False
+        try:
+            self._wakeup_w.send(b"\0")
+            self._wakeup_w.close()
+        except OSError:
+            pass
         if self._socket:
             try:
                 self._socket.close()
             except Exception:
                 pass
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        # A client that stays silent would otherwise hold its worker (and
+        # interpreter exit) for up to CONNECTION_TIMEOUT
+        with self._connections_lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
         if self.socket_path.exists():
             try:
                 self.socket_path.unlink()
@@ -75,38 +182,84 @@ class UnixSocketServer:
     def _handle_connection(self, conn: socket.socket) -> None:
         """Handle individual connection."""
         try:
-            # Read data
-            data = b""
-            while True:
-                chunk = conn.recv(4096)
-                if not chunk:
-                    break
-                data += chunk
-                if b"\n" in data:
-                    break
-
-            if data:
-                try:
-                    request = json.loads(data.decode("utf-8"))
-                    response = self._process_request(request)
-                except json.JSONDecodeError:
-                    response = {"success": False, "error": "Invalid JSON"}
-
-                conn.sendall(json.dumps(response).encode("utf-8") + b"\n")
+            if not self._peer_allowed(conn):
+                logger.warning("Rejected connection from another user")
+                self._send_response(
+                    conn, {"success": False, "error": "Permission denied"}
+                )
+                return
+
+            (length,) = HEADER.unpack(self._recv_exact(conn, HEADER.size))
+            if length > MAX_REQUEST_SIZE:
+                self._send_response(
+                    conn, {"success": False, "error": "Request too large"}
+                )
+                return
+
+            try:
+                request = _loads(self._recv_exact(conn, length))
+                response = self._process_request(request)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                response = {"success": False, "error": "Invalid JSON"}
+
+            if isinstance(response.get("data"), FileStream):
+                self._send_stream(conn, response["data"])
+            else:
+                self._send_response(conn, response)
+        except ConnectionError:
+            # Client went away before sending a complete request
+            pass
         except Exception as e:
             logger.error(f"Connection handling error: {e}")
             try:
-                conn.sendall(
-                    json.dumps({"success": False, "error": str(e)}).encode(
-                        "utf-8"
-                    )
-                    + b"\n"
-                )
+                self._send_response(conn, {"success": False, "error": str(e)})
             except Exception:
                 pass
         finally:
+            with self._connections_lock:
+                self._connections.discard(conn)
             conn.close()
 
+    @staticmethod
+    def _recv_exact(conn: socket.socket, n: int) -> bytearray:
+        """Receive exactly n bytes from the connection."""
+        buf = bytearray(n)
+        view = memoryview(buf)
+        received = 0
+        while received < n:
+            count = conn.recv_into(view[received:], n - received)
+            if count == 0:
+                raise ConnectionError("Connection closed by client")
+            received += count
+        return buf
+
+    def _send_response(self, conn: socket.socket, response: dict[str, Any]) -> None:
+        """Send a length-prefixed JSON response."""
+        payload = _dumps(response)
+        conn.sendall(HEADER.pack(len(payload)) + payload)
+
+    def _send_stream(self, conn: socket.socket, stream: FileStream) -> None:
+        """Send a stream header followed by the raw file region."""
+        with open(stream.path, "rb") as f:
+            self._send_response(
+                conn, {"success": True, "data": {"stream": True, "size": stream.size}}
+            )
+            sent = conn.sendfile(f, stream.offset, stream.size)
+        if sent < stream.size:
+            # The header is already out, so the client detects the short read
+            logger.warning(
+                f"Short stream for {stream.path}: sent {sent} of {stream.size} bytes"
+            )
+
+    @staticmethod
+    def _peer_allowed(conn: socket.socket) -> bool:
+        """Only accept clients running as the same user as the service."""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEERCRED.size)
+        _, uid, _ = PEERCRED.unpack(creds)
+        return uid == os.getuid()
+
     def _process_request(self, request: dict[str, Any]) -> dict[str, Any]:
         """Process the request using registered handlers."""
         action = request.get("action")
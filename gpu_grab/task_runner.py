@@ -1,17 +1,70 @@
 """Task execution module."""
 
+import errno
 import logging
 import os
+import re
+import shlex
 import signal
 import subprocess
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
 from .models import Task, TaskStatus
 
 logger = logging.getLogger(__name__)
 
+# Block size used when scanning log files backwards
+LOG_BLOCK_SIZE = 64 * 1024
+
+
+# Characters (or a leading VAR=value) that need a shell to interpret
+_SHELL_SYNTAX = re.compile(r"[|&;<>()$`\\*?\[\]#~{}!\n]|^\s*\w+=")
+
+# exec(2) failures that /bin/sh handles itself (or reports as 127/126)
+_SHELL_FALLBACK_ERRNOS = frozenset(
+    {errno.ENOENT, errno.EACCES, errno.EPERM, errno.ENOEXEC}
+)
+
+
+def _command_argv(command: str) -> Optional[list[str]]:
+    """Split a command into argv if it can run without a shell, else None."""
+    if _SHELL_SYNTAX.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    return argv or None
+
+
+def _tail_offset(f: BinaryIO, size: int, tail: int) -> int:
+    """Return the byte offset where the last `tail` lines of f begin."""
+    if tail <= 0 or size == 0:
+        return 0
+
+    # A trailing newline terminates the last line rather than starting a new one
+    f.seek(size - 1)
+    pos = size - 1 if f.read(1) == b"\n" else size
+
+    remaining = tail
+    while pos > 0:
+        start = max(0, pos - LOG_BLOCK_SIZE)
+        f.seek(start)
+        block = f.read(pos - start)
+        idx = len(block)
+        while True:
+            idx = block.rfind(b"\n", 0, idx)
+            if idx < 0:
+                break
+            remaining -= 1
+            if remaining == 0:
+                return start + idx + 1
+        pos = start
+    return 0
+
 
 class TaskRunner:
     """Task executor that manages subprocess lifecycle."""
@@ -19,51 +72,82 @@ class TaskRunner:
     def __init__(self, logs_dir: Path) -> None:
         self.logs_dir = logs_dir
         self.logs_dir.mkdir(parents=True, exist_ok=True)
+        # Guards the two maps below; the server thread kills tasks on cancel
+        self._lock = threading.Lock()
         self.running_processes: dict[str, subprocess.Popen] = {}
+        self._pid_to_task: dict[int, str] = {}
+        # Snapshot of the service environment, shared by every launch
+        self._base_env = dict(os.environ)
 
-    def start_task(self, task: Task, gpu_ids: list[int]) -> bool:
-        """Start a task with specified GPU IDs."""
+    def reload_env(self) -> None:
+        """Re-read the service environment for subsequently started tasks."""
+        self._base_env = dict(os.environ)
+
+    def start_task(
+        self, task: Task, gpu_ids: list[int], now: Optional[datetime] = None
+    ) -> bool:
+        """Start a task with specified GPU IDs, timestamped `now` (default: now)."""
+        now = now or datetime.now()
         try:
             # Set up environment with CUDA_VISIBLE_DEVICES
-            env = os.environ.copy()
-            env.update(task.env)
-            env["CUDA_VISIBLE_DEVICES"] = ",".join(map(str, gpu_ids))
+            env = {
+                **self._base_env,
+                **task.env,
+                "CUDA_VISIBLE_DEVICES": ",".join(map(str, gpu_ids)),
+            }
 
             # Set up log file
             log_file = self.logs_dir / f"task_{task.id}.log"
             task.log_file = str(log_file)
 
-            # Write header to log first
-            with open(log_file, "w") as log_f:
-                log_f.write(f"=== Task: {task.name or task.id} ===\n")
-                log_f.write(f"Command: {task.command}\n")
-                log_f.write(f"Working dir: {task.working_dir or os.getcwd()}\n")
-                log_f.write(f"GPUs: {gpu_ids}\n")
-                log_f.write(f"Started: {datetime.now().isoformat()}\n")
-                log_f.write("=" * 50 + "\n\n")
-
-            # Open log file in append mode and keep it open for the process
-            log_handle = open(log_file, "a")
-            process = subprocess.Popen(
-                task.command,
-                shell=True,
-                cwd=task.working_dir or None,
-                env=env,
-                stdout=log_handle,
-                stderr=subprocess.STDOUT,
-                start_new_session=True,
+            # The child inherits the fd; O_APPEND keeps its writes after the header
+            fd = os.open(
+                log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o644
             )
+            try:
+                header = (
+                    f"=== Task: {task.name or task.id} ===\n"
+                    f"Command: {task.command}\n"
+                    f"Working dir: {task.working_dir or os.getcwd()}\n"
+                    f"GPUs: {gpu_ids}\n"
+                    f"Started: {now.isoformat()}\n"
+                    f"{'=' * 50}\n\n"
+                )
+                os.write(fd, header.encode("utf-8"))
+
+                popen_kwargs = dict(
+                    cwd=task.working_dir or None,
+                    env=env,
+                    stdout=fd,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,
+                )
+                # Plain commands are exec'd directly, skipping the /bin/sh process
+                argv = _command_argv(task.command)
+                process = None
+                if argv is not None:
+                    try:
+                        process = subprocess.Popen(argv, **popen_kwargs)
+                    except OSError as e:
+                        # Builtins, scripts without a #! line or a missing binary:
+                        # let the shell run it, so errors reach the log (127/126)
+                        if e.errno not in _SHELL_FALLBACK_ERRNOS:
+                            raise
+                if process is None:
+                    process = subprocess.Popen(
+                        task.command, shell=True, **popen_kwargs
+                    )
+            finally:
+                os.close(fd)
 
             task.pid = process.pid
             task.assigned_gpus = gpu_ids
             task.status = TaskStatus.RUNNING
-            task.started_at = datetime.now()
+            task.started_at = now
 
-            self.running_processes[task.id] = process
-            # Store log handle to close later
-            if not hasattr(self, "_log_handles"):
-                self._log_handles = {}
-            self._log_handles[task.id] = log_handle
+            with self._lock:
+                self.running_processes[task.id] = process
+                self._pid_to_task[process.pid] = task.id
 
             logger.info(
                 f"Started task {task.id} (PID: {process.pid}) on GPUs {gpu_ids}"
@@ -73,10 +157,63 @@ class TaskRunner:
         except Exception as e:
             task.status = TaskStatus.FAILED
             task.error_message = str(e)
-            task.finished_at = datetime.now()
+            task.finished_at = now
             logger.error(f"Failed to start task {task.id}: {e}")
             return False
 
+    def reap_finished(self) -> dict[str, int]:
+        """
+        Collect the exit codes of tracked tasks that have finished.
+
+        Uses waitid(P_ALL) so the cost scales with the number of exited
+        children rather than the number of running ones.
+
+        Returns:
+            Mapping of task ID to exit code.
+        """
+        if not hasattr(os, "waitid"):
+            return self._poll_all()
+
+        finished: dict[str, int] = {}
+        while True:
+            try:
+                # WNOWAIT leaves the child for Popen to reap, keeping returncode
+                info = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            except ChildProcessError:
+                break
+            if info is None:
+                break
+
+            with self._lock:
+                task_id = self._pid_to_task.pop(info.si_pid, None)
+                process = self.running_processes.pop(task_id, None) if task_id else None
+            if process is None:
+                # Untracked (e.g. a killed task): reap it so the scan moves on
+                try:
+                    os.waitpid(info.si_pid, os.WNOHANG)
+                except ChildProcessError:
+                    pass
+                continue
+
+            exit_code = process.wait()
+            logger.debug(f"Task {task_id} exited with code {exit_code}")
+            finished[task_id] = exit_code
+        return finished
+
+    def _poll_all(self) -> dict[str, int]:
+        """Poll every tracked process (fallback where waitid is unavailable)."""
+        finished: dict[str, int] = {}
+        with self._lock:
+            for task_id, process in list(self.running_processes.items()):
+                exit_code = process.poll()
+                if exit_code is not None:
+                    del self.running_processes[task_id]
+                    self._pid_to_task.pop(process.pid, None)
+                    finished[task_id] = exit_code
+        for task_id, exit_code in finished.items():
+            logger.debug(f"Task {task_id} exited with code {exit_code}")
+        return finished
+
     def check_task(self, task: Task) -> Optional[int]:
         """
         Check task status.
@@ -84,18 +221,16 @@ class TaskRunner:
         Returns:
             Exit code if completed, None if still running.
         """
-        if task.id in self.running_processes:
-            process = self.running_processes[task.id]
-            exit_code = process.poll()
-
+        with self._lock:
+            process = self.running_processes.get(task.id)
+            exit_code = process.poll() if process is not None else None
             if exit_code is not None:
                 del self.running_processes[task.id]
-                # Close log handle if exists
-                if hasattr(self, "_log_handles") and task.id in self._log_handles:
-                    self._log_handles[task.id].close()
-                    del self._log_handles[task.id]
-                logger.debug(f"Task {task.id} exited with code {exit_code}")
+                self._pid_to_task.pop(process.pid, None)
 
+        if process is not None:
+            if exit_code is not None:
+                logger.debug(f"Task {task.id} exited with code {exit_code}")
             return exit_code
 
         # Process not in our tracking, check if it's still running via PID
@@ -111,15 +246,18 @@ class TaskRunner:
 
     def kill_task(self, task: Task) -> bool:
         """Kill a running task."""
+        with self._lock:
+            process = self.running_processes.pop(task.id, None)
+            if process is not None:
+                self._pid_to_task.pop(process.pid, None)
+
         try:
-            if task.id in self.running_processes:
-                process = self.running_processes[task.id]
+            if process is not None:
                 try:
                     # Kill the entire process group
                     os.killpg(os.getpgid(process.pid), signal.SIGTERM)
                 except ProcessLookupError:
                     pass
-                del self.running_processes[task.id]
                 logger.info(f"Killed task {task.id} (PID: {task.pid})")
                 return True
             elif task.pid:
@@ -134,6 +272,26 @@ class TaskRunner:
 
         return False
 
+    def get_log_range(
+        self, task: Task, tail: int = 100
+    ) -> Optional[tuple[str, int, int]]:
+        """
+        Locate the last `tail` lines of the task log.
+
+        Returns:
+            (path, offset, size) of the region, or None if the log is unavailable.
+        """
+        if not task.log_file:
+            return None
+
+        try:
+            with open(task.log_file, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                offset = _tail_offset(f, size, tail)
+        except OSError:
+            return None
+        return task.log_file, offset, size - offset
+
     def get_log_content(
         self, task: Task, tail: int = 100, follow: bool = False
     ) -> str:
@@ -146,20 +304,23 @@ class TaskRunner:
             return "Log file not found"
 
         try:
-            with open(log_path, "r") as f:
-                lines = f.readlines()
-                if tail > 0:
-                    lines = lines[-tail:]
-                return "".join(lines)
+            # Only the tail region is read, however large the log has grown
+            with open(log_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                f.seek(_tail_offset(f, size, tail))
+                return f.read().decode("utf-8", "replace")
         except Exception as e:
             return f"Error reading log: {e}"
 
     def cleanup(self) -> None:
         """Clean up all running processes (for shutdown)."""
-        for task_id, process in list(self.running_processes.items()):
+        with self._lock:
+            processes = list(self.running_processes.items())
+            self.running_processes.clear()
+            self._pid_to_task.clear()
+        for task_id, process in processes:
             try:
                 os.killpg(os.getpgid(process.pid), signal.SIGTERM)
                 logger.info(f"Terminated process for task {task_id}")
             except Exception as e:
                 logger.warning(f"Error terminating task {task_id}: {e}")
-        self.running_processes.clear()
@@ -0,0 +1,90 @@
+"""Tests for NVML usage by the scheduler and status requests."""
+
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from gpu_grab import gpu_monitor
+from gpu_grab.__main__ import RequestHandlers
+from gpu_grab.config import Config
+from gpu_grab.models import SubmitParams
+from gpu_grab.scheduler import Scheduler
+
+GPU_COUNT = 2
+PER_GPU_QUERIES = (
+    "nvmlDeviceGetMemoryInfo",
+    "nvmlDeviceGetUtilizationRates",
+    "nvmlDeviceGetTemperature",
+)
+
+
+class FakeClock:
+    """Stand-in for the time module as seen by gpu_monitor."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def nvml_calls(monkeypatch: pytest.MonkeyPatch) -> Counter:
+    """Replace the NVML bindings used by gpu_monitor with counting fakes."""
+    calls: Counter = Counter()
+    memory = SimpleNamespace(total=16 << 30, used=1 << 30, free=15 << 30)
+    fakes: dict[str, Any] = {
+        "nvmlInit": lambda: None,
+        "nvmlShutdown": lambda: None,
+        "nvmlDeviceGetCount": lambda: GPU_COUNT,
+        "nvmlDeviceGetHandleByIndex": lambda i: i,
+        "nvmlDeviceGetName": lambda handle: b"Fake GPU",
+        "nvmlDeviceGetMemoryInfo": lambda handle: memory,
+        "nvmlDeviceGetUtilizationRates": lambda handle: SimpleNamespace(gpu=0),
+        "nvmlDeviceGetTemperature": lambda handle, sensor: 40,
+    }
+
+    def counting(name: str, fake: Any) -> Any:
+        def call(*args: Any) -> Any:
+            calls[name] += 1
+            return fake(*args)
+
+        return call
+
+    for name, fake in fakes.items():
+        monkeypatch.setattr(gpu_monitor, name, counting(name, fake))
+    return calls
+
+
+def test_ticks_and_status_share_one_sweep(
+    nvml_calls: Counter, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    clock = FakeClock()
+    monkeypatch.setattr(gpu_monitor, "time", clock)
+    scheduler = Scheduler(Config(base_dir=tmp_path))
+    handlers = RequestHandlers(scheduler)
+    # Needs more GPUs than exist, so every tick queries GPUs but starts nothing
+    scheduler.queue_manager.add_task_from_params(
+        SubmitParams(command="true", gpu_count=GPU_COUNT + 1)
+    )
+
+    for _ in range(3):
+        scheduler._tick()
+        handlers.status()
+    for name in PER_GPU_QUERIES:
+        assert nvml_calls[name] == GPU_COUNT
+    # Handles and names are looked up once per NVML session
+    assert nvml_calls["nvmlInit"] == 1
+    assert nvml_calls["nvmlDeviceGetName"] == GPU_COUNT
+
+    # Once the snapshot expires, the next caller takes exactly one new sweep
+    clock.now += gpu_monitor.SNAPSHOT_TTL
+    scheduler._tick()
+    handlers.status()
+    for name in PER_GPU_QUERIES:
+        assert nvml_calls[name] == 2 * GPU_COUNT
+
+    scheduler.queue_manager.close()
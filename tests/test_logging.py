@@ -0,0 +1,36 @@
+"""Tests for the service log handler."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPT = """
+import logging, sys
+from gpu_grab.__main__ import BufferedRotatingFileHandler
+
+handler = BufferedRotatingFileHandler(sys.argv[1], maxBytes=1024 * 1024)
+log = logging.getLogger("gpu_grab.test")
+log.addHandler(handler)
+log.propagate = False
+log.warning("h\\u00e9llo")
+handler.close()
+"""
+
+
+def test_handler_writes_utf8_without_utf8_mode(tmp_path: Path) -> None:
+    """Records reach the file when Python is not in UTF-8 mode (systemd)."""
+    log_file = tmp_path / "gpu-grab.log"
+    env = {**os.environ, "LC_ALL": "C", "PYTHONPATH": str(ROOT)}
+    env.pop("PYTHONUTF8", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "utf8=0", "-c", SCRIPT, str(log_file)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "Logging error" not in result.stderr
+    assert log_file.read_bytes() == "héllo\n".encode("utf-8")
@@ -0,0 +1,179 @@
+"""Tests for QueueManager persistence."""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from gpu_grab.models import SubmitParams, TaskStatus
+from gpu_grab.queue_manager import QueueManager
+
+
+class FailingStatement:
+    """Connection proxy whose first statement starting with `prefix` fails."""
+
+    def __init__(self, conn: sqlite3.Connection, prefix: str) -> None:
+        self.conn = conn
+        self.prefix = prefix
+        self.fail = True
+
+    def execute(self, sql: str, *args: Any) -> sqlite3.Cursor:
+        if self.fail and sql.startswith(self.prefix):
+            self.fail = False
+            raise sqlite3.OperationalError("database or disk is full")
+        return self.conn.execute(sql, *args)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.conn, name)
+
+
+def _on_disk(data_dir: Path) -> dict[str, str]:
+    with sqlite3.connect(data_dir / "tasks.db") as conn:
+        return dict(conn.execute("SELECT id, status FROM tasks"))
+
+
+def test_batch_defers_only_its_own_updates(tmp_path: Path) -> None:
+    queue = QueueManager(tmp_path)
+    task_id = queue.add_task_from_params(SubmitParams(command="true"))
+
+    submitted: list[str] = []
+    with queue.batch():
+        task = queue.get_task(task_id)
+        task.status = TaskStatus.RUNNING
+        queue.update_task(task)
+
+        # A submit from another thread is committed before the batch ends
+        thread = threading.Thread(
+            target=lambda: submitted.append(
+                queue.add_task_from_params(SubmitParams(command="true"))
+            )
+        )
+        thread.start()
+        thread.join()
+        assert submitted[0] in _on_disk(tmp_path)
+        assert _on_disk(tmp_path)[task_id] == "pending"
+
+    assert _on_disk(tmp_path)[task_id] == "running"
+    queue.close()
+
+
+def test_failed_batch_commit_is_rolled_back_and_retried(tmp_path: Path) -> None:
+    queue = QueueManager(tmp_path)
+    task_id = queue.add_task_from_params(SubmitParams(command="true"))
+    conn = queue._conn
+    queue._conn = FailingStatement(conn, "COMMIT")
+
+    with queue.batch():
+        task = queue.get_task(task_id)
+        task.status = TaskStatus.RUNNING
+        queue.update_task(task)
+    assert not conn.in_transaction
+    assert _on_disk(tmp_path)[task_id] == "pending"
+
+    # The next batch writes the update that failed
+    with queue.batch():
+        pass
+    assert _on_disk(tmp_path)[task_id] == "running"
+
+    queue.close()
+    assert _on_disk(tmp_path) == {task_id: "running"}
+
+
+def test_failed_cancel_leaves_task_pending(tmp_path: Path) -> None:
+    queue = QueueManager(tmp_path)
+    task_id = queue.add_task_from_params(SubmitParams(command="true"))
+    queue._conn = FailingStatement(queue._conn, "UPDATE")
+
+    with pytest.raises(sqlite3.OperationalError):
+        queue.cancel_task(task_id)
+    assert queue.get_task(task_id).status is TaskStatus.PENDING
+    assert queue.get_statistics()["pending"] == 1
+    assert _on_disk(tmp_path)[task_id] == "pending"
+
+
+def test_failed_update_is_retried(tmp_path: Path) -> None:
+    queue = QueueManager(tmp_path)
+    task_id = queue.add_task_from_params(SubmitParams(command="true"))
+    queue._conn = FailingStatement(queue._conn, "UPDATE")
+
+    task = queue.get_task(task_id)
+    task.status = TaskStatus.RUNNING
+    with pytest.raises(sqlite3.OperationalError):
+        queue.update_task(task)
+    assert queue.get_statistics()["running"] == 1
+
+    queue.close()
+    assert _on_disk(tmp_path)[task_id] == "running"
+
+
+def test_reads_do_not_wait_on_sqlite(tmp_path: Path) -> None:
+    queue = QueueManager(tmp_path)
+    task_id = queue.add_task_from_params(SubmitParams(command="true"))
+
+    # Stand in for a slow commit or checkpoint holding the connection
+    with queue._db_lock:
+        results: list[Any] = []
+        thread = threading.Thread(
+            target=lambda: results.extend(
+                [queue.get_task(task_id), queue.get_statistics()["pending"]]
+            )
+        )
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+    assert results[0].id == task_id
+    assert results[1] == 1
+    queue.close()
+
+
+def test_legacy_json_migrates_with_status_and_timestamps(tmp_path: Path) -> None:
+    created = datetime(2024, 5, 1, 9, 30)
+    started = datetime(2024, 5, 1, 9, 31, 15, 250000)
+    finished = datetime(2024, 5, 1, 10, 2, 3)
+    records = [
+        {"id": "pending1", "command": "true", "status": "pending",
+         "created_at": created.isoformat()},
+        {"id": "running1", "command": "sleep 60", "status": "running",
+         "created_at": created.isoformat(), "started_at": started.isoformat(),
+         "pid": 4242, "assigned_gpus": [0, 1]},
+        {"id": "done1", "command": "true", "status": "completed",
+         "created_at": created.isoformat(), "started_at": started.isoformat(),
+         "finished_at": finished.isoformat(), "exit_code": 0},
+        {"id": "cancel1", "command": "true", "status": "cancelled",
+         "created_at": created.isoformat(), "finished_at": finished.isoformat()},
+    ]
+    (tmp_path / "tasks.json").write_text(json.dumps(records))
+
+    queue = QueueManager(tmp_path)
+    queue.close()
+    # Read back through a fresh instance so the rows, not the cache, are checked
+    queue = QueueManager(tmp_path)
+
+    assert not (tmp_path / "tasks.json").exists()
+    assert (tmp_path / "tasks.json.migrated").exists()
+    assert _on_disk(tmp_path) == {
+        "pending1": "pending",
+        "running1": "running",
+        "done1": "completed",
+        "cancel1": "cancelled",
+    }
+
+    running = queue.get_task("running1")
+    assert running.status is TaskStatus.RUNNING
+    assert (running.created_at, running.started_at) == (created, started)
+    assert (running.pid, running.assigned_gpus) == (4242, [0, 1])
+    done = queue.get_task("done1")
+    assert (done.started_at, done.finished_at, done.exit_code) == (started, finished, 0)
+    cancelled = queue.get_task("cancel1")
+    assert cancelled.status is TaskStatus.CANCELLED
+    assert cancelled.finished_at == finished
+    pending = queue.get_task("pending1")
+    assert (pending.created_at, pending.started_at, pending.finished_at) == (
+        created, None, None
+    )
+    queue.close()
@@ -0,0 +1,60 @@
+"""Tests for scheduler ticks racing with request handlers."""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from gpu_grab.__main__ import RequestHandlers
+from gpu_grab.config import Config
+from gpu_grab.models import SubmitParams, TaskStatus
+from gpu_grab.scheduler import Scheduler
+
+
+@pytest.fixture
+def scheduler(tmp_path: Path) -> Iterator[Scheduler]:
+    scheduler = Scheduler(Config(base_dir=tmp_path))
+    yield scheduler
+    scheduler.queue_manager.close()
+
+
+def test_pending_task_cancelled_mid_tick_is_not_started(
+    scheduler: Scheduler, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    handlers = RequestHandlers(scheduler)
+    task_id = scheduler.queue_manager.add_task_from_params(SubmitParams(command="true"))
+
+    def cancel_then_fit(requirements, excluded_gpus):
+        handlers.cancel(task_id)
+        return [0]
+
+    monkeypatch.setattr(scheduler.gpu_monitor, "check_requirements", cancel_then_fit)
+    monkeypatch.setattr(
+        scheduler.task_runner, "start_task", lambda *args: pytest.fail("started")
+    )
+    scheduler._tick()
+
+    assert scheduler.queue_manager.get_task(task_id).status is TaskStatus.CANCELLED
+
+
+def test_running_task_cancelled_mid_tick_keeps_its_status(
+    scheduler: Scheduler, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    handlers = RequestHandlers(scheduler)
+    task_id = scheduler.queue_manager.add_task_from_params(SubmitParams(command="true"))
+    task = scheduler.queue_manager.get_task(task_id)
+    task.status = TaskStatus.RUNNING
+    scheduler.queue_manager.update_task(task)
+
+    def cancel_then_reap():
+        handlers.cancel(task_id)
+        # The kill shows up as the child's exit status
+        return {task_id: -9}
+
+    monkeypatch.setattr(scheduler.task_runner, "kill_task", lambda task: True)
+    monkeypatch.setattr(scheduler.task_runner, "reap_finished", cancel_then_reap)
+    scheduler._tick()
+
+    task = scheduler.queue_manager.get_task(task_id)
+    assert task.status is TaskStatus.CANCELLED
+    assert task.exit_code is None
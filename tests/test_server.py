@@ -0,0 +1,32 @@
+"""Tests for UnixSocketServer shutdown."""
+
+import socket
+import threading
+import time
+from pathlib import Path
+
+from gpu_grab.server import CONNECTION_TIMEOUT, UnixSocketServer
+
+
+def test_stop_does_not_wait_for_silent_clients(tmp_path: Path) -> None:
+    socket_path = tmp_path / "gpu-grab.sock"
+    server = UnixSocketServer(socket_path, {})
+    thread = threading.Thread(target=server.start)
+    thread.start()
+    while not socket_path.exists():
+        time.sleep(0.01)
+
+    # Connects and never sends a request, pinning a worker in recv
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(str(socket_path))
+    while not server._pool._threads:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    server.stop()
+    thread.join()
+    # What the interpreter does with pool workers at exit
+    for worker in server._pool._threads:
+        worker.join(timeout=CONNECTION_TIMEOUT)
+    assert time.monotonic() - started < 5
+    client.close()
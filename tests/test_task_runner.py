@@ -0,0 +1,38 @@
+"""Tests for TaskRunner process launching."""
+
+import time
+from pathlib import Path
+
+from gpu_grab.models import Task
+from gpu_grab.task_runner import TaskRunner
+
+
+def _run(runner: TaskRunner, command: str) -> tuple[int, str]:
+    """Start a command and return its exit code and log output."""
+    task = Task(command=command)
+    assert runner.start_task(task, [0])
+    deadline = time.monotonic() + 10
+    while (finished := runner.reap_finished()).get(task.id) is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    output = Path(task.log_file).read_text().split("=" * 50 + "\n\n", 1)[1]
+    return finished[task.id], output
+
+
+def test_shell_builtins_fall_back_to_shell(tmp_path: Path) -> None:
+    runner = TaskRunner(tmp_path)
+    assert _run(runner, "command echo hi") == (0, "hi\n")
+    assert _run(runner, "exit 3") == (3, "")
+
+
+def test_script_without_shebang_runs_through_shell(tmp_path: Path) -> None:
+    script = tmp_path / "run.sh"
+    script.write_text("echo from script\nexit 4\n")
+    script.chmod(0o755)
+    assert _run(TaskRunner(tmp_path / "logs"), str(script)) == (4, "from script\n")
+
+
+def test_missing_binary_reports_through_shell(tmp_path: Path) -> None:
+    exit_code, output = _run(TaskRunner(tmp_path), "no-such-binary --flag")
+    assert exit_code == 127
+    assert "not found" in output